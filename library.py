@@ -1,9 +1,17 @@
 import argparse
+import bisect
 from dataclasses import dataclass, field
 import logging
-import os
+import operator
+import re
 import sys
 
+try:
+    from sortedcontainers import SortedKeyList
+except ImportError:
+    # Optional dependency, without it the books are kept in a plain list
+    SortedKeyList = None
+
 logging.basicConfig(
     filename="Library.log",
     encoding="utf-8",
@@ -16,8 +24,36 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class _StdoutHandler(logging.StreamHandler):
+    """
+    StreamHandler that writes to the current sys.stdout (like print does),
+    not to the stream that existed when the handler was created
+    """
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+# Database file warnings are shown to the user through this logger, in addition to the log file
+database_logger = logger.getChild("database")
+_console = _StdoutHandler()
+_console.setLevel(logging.WARNING)
+database_logger.addHandler(_console)
+
+
 MENU_BORDER = "*" * 15
 
+# Translation table for removing the hyphens from ISBN-13 values
+_HYPHEN_TABLE = str.maketrans("", "", "-")
+
+# Well-formed database line: Title/Writer/ISBN-13 (13 digits)/Publishing-year (4 digits)
+_LINE_RE = re.compile(r"\s*([^/]*?)\s*/\s*([^/]*?)\s*/\s*([0-9]{13})\s*/\s*([0-9]{4})\s*")
+
 
 def handle_error(error, message, log_level=logging.ERROR, exit_code=None):
     """
@@ -35,76 +71,109 @@ def handle_error(error, message, log_level=logging.ERROR, exit_code=None):
 
     print(f"{message}: {error}")
 
-    if log_level == logging.CRITICAL:
-        logger.critical(message, exc_info=True)
-    elif log_level == logging.ERROR:
-        logger.error(message, exc_info=True)
-    elif log_level == logging.WARNING:
-        logger.warning(message)
-    else:
-        logger.info(message)
+    # Include the traceback only for errors and critical errors
+    logger.log(log_level, message, exc_info=log_level >= logging.ERROR)
 
     if exit_code is not None:
         sys.exit(exit_code)
 
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class Book:
     sort_index: int = field(init=False, repr=False, compare=True)
     title: str
     writer: str
-    isbn: str
-    publishing_year: str
+    isbn: int
+    publishing_year: int
 
     def __post_init__(self):
-        self.sort_index = int(self.publishing_year)
+        # Accept the ISBN-13 and the publishing year also as (digits only) strings
+        if isinstance(self.isbn, str):
+            self.isbn = int(self.isbn)
+        if isinstance(self.publishing_year, str):
+            self.publishing_year = int(self.publishing_year)
+        self.sort_index = self.publishing_year
+
+    def __lt__(self, other) -> bool:
+        # Books are ordered by the publishing year only, compared directly as ints
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.sort_index < other.sort_index
 
     def __str__(self) -> str:
-        return f"{self.title.upper()} ({self.publishing_year}) by {self.writer} [ISBN-13: {self.isbn}]"
+        return f"{self.title.upper()} ({self.publishing_year:04d}) by {self.writer} [ISBN-13: {self.isbn:013d}]"
 
     def file_line_format(self) -> str:
-        return f"{self.title}/{self.writer}/{self.isbn}/{self.publishing_year}"
+        return f"{self.title}/{self.writer}/{self.isbn:013d}/{self.publishing_year:04d}"
+
 
+# Books are sorted by the publishing year
+_BOOK_SORT_KEY = operator.attrgetter("sort_index")
+
+
+def _new_book_collection() -> "list[Book] | SortedKeyList":
+    """
+    Create the collection for the library books. A SortedKeyList (kept sorted by the
+    publishing year) is used if sortedcontainers is installed, otherwise a plain list
 
-@dataclass
+    Returns:
+        An empty book collection
+    """
+    if SortedKeyList is None:
+        return []
+    return SortedKeyList(key=_BOOK_SORT_KEY)
+
+
+def _is_sorted_collection(books) -> bool:
+    """
+    Check if the book collection keeps itself sorted by the publishing year
+
+    Args:
+        books: The book collection to check
+
+    Returns:
+        True if the collection is a SortedKeyList
+    """
+    return SortedKeyList is not None and isinstance(books, SortedKeyList)
+
+
+@dataclass(slots=True)
 class Library:
     filename: str
-    books: list[Book] = field(default_factory=list)
+    # A SortedKeyList if sortedcontainers is installed, otherwise a plain list (see _new_book_collection)
+    books: "list[Book] | SortedKeyList" = field(default_factory=_new_book_collection)
+
+    # Sorted view of a plain list of books, rebuilt only when marked dirty
+    _sorted_books: list[Book] = field(default_factory=list, init=False, repr=False, compare=False)
+    _sorted_dirty: bool = field(default=True, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        self.clean_database_file()
         self.load_file_contents()
 
-    def clean_database_file(self) -> None:
+    def clean_database_file(self, non_empty_lines: list[str], lines_removed: int) -> None:
         """
-        Clean empty lines from the database file and rewrite the file
+        Re-write the database file without the empty lines found while loading it.
+        Nothing is written if the file didn't contain any empty lines
+
+        Args:
+            non_empty_lines: The raw non-empty lines of the database file
+            lines_removed: Number of empty lines that were found in the file
 
         Returns:
             None
         """
-        # File doesn't exist so there are no lines to clean
-        if not os.path.exists(self.filename):
+        # The file is already clean, skip the re-write
+        if lines_removed == 0:
             return
 
         try:
-            with open(self.filename, "r") as file:
-                lines = file.readlines()
-
-            non_empty_lines = [line for line in lines if line.strip()]
-
-            # Re-write the file with non-empty files
-            with open(self.filename, "w") as file:
+            # Re-write the file with non-empty lines, keeping their original line endings
+            with open(self.filename, "w", encoding="utf-8", newline="") as file:
                 file.writelines(non_empty_lines)
 
-            # Total number of lines removed
-            lines_removed = len(lines) - len(non_empty_lines)
-
-            if lines_removed:
-                log_msg = (
-                    f"Removed {lines_removed} empty line(s) from the database file"
-                )
-                logger.info(log_msg)
-                print(log_msg)
+            log_msg = f"Removed {lines_removed} empty line(s) from the database file"
+            logger.info(log_msg)
+            print(log_msg)
 
         except PermissionError as e:
             handle_error(
@@ -123,17 +192,20 @@ class Library:
 
     def load_file_contents(self) -> None:
         """
-        Load the book records from the database file into the array
+        Load the book records from the database file into the array. Empty lines
+        are counted during the same pass and the file is re-written only if any were found
 
         Returns:
             None
         """
         try:
-            # Check if the provided file name exists - if not, create one
-            if not os.path.exists(self.filename):
+            try:
+                # No newline translation, the line endings are removed when the lines are stripped
+                f = open(self.filename, "r", encoding="utf-8", newline="", buffering=1 << 20)
+            except FileNotFoundError:
+                # The provided file doesn't exist - create one, there is nothing to load
                 try:
-                    with open(self.filename, "w"):
-                        pass
+                    open(self.filename, "x").close()
                     log_msg = f"New library database created: {self.filename}"
                     logger.info(log_msg)
                     print(log_msg)
@@ -144,55 +216,24 @@ class Library:
                         logging.CRITICAL,
                         1,
                     )
+                return
 
-            with open(self.filename) as f:
-                for line_number, line in enumerate(f, 1):
-                    # Skip all the empty lines in the file
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        book_parts = [part.strip() for part in line.split("/")]
-
-                        # Line has less than 4 fields, ignore and continue
-                        if len(book_parts) < 4:
-                            log_msg = f"{self.filename}: Line {line_number} has {len(book_parts)} parts, expected 4, ignoring"
-                            logger.warning(log_msg)
-                            print(log_msg)
-                            continue
-
-                        title, writer, isbn, publishing_year = book_parts[:4]
-
-                        # Publishing year doesn't have a valid [digit] value, ignore and continue
-                        if not publishing_year.isdigit():
-                            log_msg = f"{self.filename}: Line {line_number} has an invalid (non-digit) year: '{publishing_year}', ignoring"
-                            logger.warning(log_msg)
-                            print(log_msg)
-                            continue
-
-                        # isbn doesn't have a valid [digit] value, ignore and continue
-                        if not isbn.isdigit():
-                            log_msg = f"{self.filename}: Line {line_number} has an invalid (non-digit) ISBN-13: '{isbn}', ignoring"
-                            logger.warning(log_msg)
-                            print(log_msg)
-                            continue
-
-                        # Everything looks fine, add the book to the array
-                        self.books.append(Book(title, writer, isbn, publishing_year))
-
-                        # Warn if the line has more than 4 fields
-                        if len(book_parts) > 4:
-                            log_msg = f"{self.filename}: Line {line_number} has {len(book_parts)} parts, only first 4 are used"
-                            logger.warning(log_msg)
-                            print(log_msg)
-
-                    except Exception as e:
-                        handle_error(
-                            e,
-                            f"{self.filename}: Unexpected error on line {line_number} '{line}'",
-                            logging.ERROR,
-                        )
+            # A SortedKeyList gets all the loaded books in one update (sorted once instead of
+            # inserting each book), a plain list is appended to directly
+            if _is_sorted_collection(self.books):
+                loaded_books = []
+                add_book = loaded_books.append
+            else:
+                loaded_books = None
+                add_book = self.books.append
+
+            with f:
+                non_empty_lines, empty_count = self._load_lines(f, add_book)
+
+            if loaded_books is not None:
+                self.books.update(loaded_books)
+
+            self.clean_database_file(non_empty_lines, empty_count)
 
         except PermissionError as e:
             handle_error(
@@ -216,6 +257,122 @@ class Library:
                 1,
             )
 
+    def _load_lines(self, lines, add_book) -> tuple[list[str], int]:
+        """
+        Load the book records from the lines of the database file
+
+        Args:
+            lines: Iterable of the raw (decoded) lines of the database file
+            add_book: Function that adds a Book to the library books
+
+        Returns:
+            The non-empty lines of the file and the number of empty lines
+        """
+        non_empty_lines = []
+        empty_count = 0
+
+        # Local references for the names used in the loop, avoids global and attribute lookups per line
+        keep_line = non_empty_lines.append
+        match_line = _LINE_RE.fullmatch
+        parse_line = self._parse_line
+        book_class = Book
+
+        for line_number, raw_line in enumerate(lines, 1):
+            # Skip all the empty lines in the file, they are cleaned after the loop
+            line = raw_line.strip()
+            if not line:
+                empty_count += 1
+                continue
+
+            keep_line(raw_line)
+
+            try:
+                # Fast path for well-formed lines, the rest are validated field by field
+                match = match_line(line)
+                if match is not None:
+                    title, writer, isbn, publishing_year = match.groups()
+                    add_book(book_class(title, writer, int(isbn), int(publishing_year)))
+                    continue
+
+                book = parse_line(line, line_number)
+                if book is not None:
+                    add_book(book)
+
+            except Exception as e:
+                handle_error(
+                    e,
+                    f"{self.filename}: Unexpected error on line {line_number} '{line}'",
+                    logging.ERROR,
+                )
+
+        return non_empty_lines, empty_count
+
+    def _parse_line(self, line: str, line_number: int) -> Book | None:
+        """
+        Validate the fields of a database line and create a Book from it
+
+        Args:
+            line: The stripped, non-empty database line
+            line_number: Number of the line in the database file (for the warnings)
+
+        Returns:
+            The Book object or None if the line is invalid
+        """
+        # At most 4 parts, any extra fields are left in the last one
+        book_parts = line.split("/", 3)
+
+        # Line has less than 4 fields, ignore
+        if len(book_parts) < 4:
+            database_logger.warning(
+                "%s: Line %d has %d parts, expected 4, ignoring",
+                self.filename,
+                line_number,
+                len(book_parts),
+            )
+            return None
+
+        title, writer, isbn, rest = book_parts
+        publishing_year, extra_separator, extra_fields = rest.partition("/")
+
+        title = title.strip()
+        writer = writer.strip()
+        isbn = isbn.strip()
+        publishing_year = publishing_year.strip()
+
+        # Publishing year doesn't have a valid [digit] value, ignore
+        if not publishing_year.isdigit():
+            database_logger.warning(
+                "%s: Line %d has an invalid (non-digit) year: '%s', ignoring",
+                self.filename,
+                line_number,
+                publishing_year,
+            )
+            return None
+
+        # isbn isn't a valid [13 digits, optional hyphens] ISBN-13 value, ignore
+        clean_isbn = _validate_isbn(isbn)
+        if clean_isbn is None:
+            database_logger.warning(
+                "%s: Line %d has an invalid ISBN-13: '%s', ignoring",
+                self.filename,
+                line_number,
+                isbn,
+            )
+            return None
+
+        # Warn if the line has more than 4 fields
+        if extra_separator:
+            parts_count = 5 + extra_fields.count("/")
+            database_logger.warning(
+                "%s: Line %d has %d parts, only first 4 are used",
+                self.filename,
+                line_number,
+                parts_count,
+            )
+
+        # Everything looks fine, create the book
+        return Book(title, writer, int(clean_isbn), int(publishing_year))
+
     def save_to_database(self, book: Book) -> None:
         """
         Save the book into the database
@@ -226,35 +383,69 @@ class Library:
         Returns:
             None
         """
-        # Check if a book with the same ISBN already exists
-        for existing_book in self.books:
-            if existing_book.isbn == book.isbn:
+        self.save_many([book])
+
+    def save_many(self, books: list[Book]) -> None:
+        """
+        Save multiple books into the database with a single write. Books with an
+        ISBN-13 that already exists in the database (or earlier in the batch) are skipped
+
+        Args:
+            books: The Book objects to save to the database
+
+        Returns:
+            None
+        """
+        existing_books = {existing_book.isbn: existing_book for existing_book in self.books}
+        new_books = []
+
+        for book in books:
+            # Check if a book with the same ISBN already exists
+            existing_book = existing_books.get(book.isbn)
+            if existing_book is not None:
                 print(
-                    f"ERROR: A book with ISBN-13 '{book.isbn}' already exists in the database: {existing_book}"
+                    f"ERROR: A book with ISBN-13 '{book.isbn:013d}' already exists in the database: {existing_book}"
                 )
                 print(f"Operation cancelled: Book not added to database")
                 logger.warning(
-                    f"Attempted to add a duplicate book with an already existing ISBN-13 '{book.isbn}'"
+                    "Attempted to add a duplicate book with an already existing ISBN-13 '%013d'",
+                    book.isbn,
                 )
-                return
+                continue
+
+            existing_books[book.isbn] = book
+            new_books.append(book)
+
+        if not new_books:
+            return
 
         try:
-            with open(self.filename, "a") as f:
-                f.write(f"{book.file_line_format()}\n")
+            payload = "\n".join(book.file_line_format() for book in new_books) + "\n"
+            with open(self.filename, "a", encoding="utf-8", buffering=1 << 16) as f:
+                f.write(payload)
 
-            # Add the book to the array ONLY if it was successfully written to the database file
-            self.books.append(book)
-            log_msg = f"New book '{book}' successfully added to the database"
-            print(log_msg)
-            logger.debug(log_msg)
+            # Add the books to the array ONLY if they were successfully written to the database file
+            if _is_sorted_collection(self.books):
+                self.books.update(new_books)
+            else:
+                self.books.extend(new_books)
+
+                # Keep the sorted view up to date without a full re-sort
+                if not self._sorted_dirty:
+                    for book in new_books:
+                        bisect.insort(self._sorted_books, book, key=_BOOK_SORT_KEY)
+
+            for book in new_books:
+                print(f"New book '{book}' successfully added to the database")
+                logger.debug("New book '%s' successfully added to the database", book)
         except IOError as e:
             handle_error(
                 e,
-                f"ERROR: Failed to save the book to the file '{self.filename}'",
+                f"ERROR: Failed to save the book(s) to the file '{self.filename}'",
                 logging.ERROR,
             )
         except Exception as e:
-            handle_error(e, "ERROR: Unexpected error saving the book", logging.ERROR)
+            handle_error(e, "ERROR: Unexpected error saving the book(s)", logging.ERROR)
 
     def list_books(self) -> None:
         """
@@ -269,8 +460,16 @@ class Library:
             print("Database doesn't contain any books")
             return
 
+        if _is_sorted_collection(self.books):
+            sorted_books = self.books
+        else:
+            if self._sorted_dirty:
+                self._sorted_books = sorted(self.books, key=_BOOK_SORT_KEY)
+                self._sorted_dirty = False
+            sorted_books = self._sorted_books
+
         print(f"Books in '{self.filename}' (sorted by year):")
-        print("\n".join(f"\t{book}" for book in sorted(self.books)))
+        print("\n".join(f"\t{book}" for book in sorted_books))
         print("")
 
 
@@ -303,6 +502,24 @@ def read_str_input(prompt: str, min_length: int = 1, max_length: int = 100) -> s
             return value
 
 
+def _validate_isbn(value: str) -> str | None:
+    """
+    Validate an ISBN-13 value in numeric-only or hyphenated format
+
+    Args:
+        value: The ISBN-13 value to validate
+
+    Returns:
+        The ISBN-13 string (numeric only, hyphens removed) or None if the value is invalid
+    """
+    clean_value = value.translate(_HYPHEN_TABLE)
+
+    if len(clean_value) != 13 or not clean_value.isdigit():
+        return None
+
+    return clean_value
+
+
 def read_isbn_input(prompt: str) -> str:
     """
     Read and validate ISBN-13 input. Accepts both numeric-only format (1234567890123) and hyphenated format (123-456-78901-2-3)
@@ -321,22 +538,18 @@ def read_isbn_input(prompt: str) -> str:
             print(f"'{field}' cannot be empty, please try again")
             continue
 
-        # Remove hyphens for validation
-        clean_value = value.replace("-", "")
+        clean_value = _validate_isbn(value)
+        if clean_value is not None:
+            return clean_value
 
-        if len(clean_value) != 13:
+        # Invalid value, only pick the error message to show
+        if len(value.translate(_HYPHEN_TABLE)) != 13:
             print(f"ISBN-13 must contain exactly 13 digits")
-            continue
-
-        # Cleaned value contains non-digit characters
-        if not clean_value.isdigit():
+        else:
             print(f"ISBN-13 must contain only digits and optional hyphens")
-            continue
 
-        return clean_value
 
-
-def read_year_input(prompt: str) -> str:
+def read_year_input(prompt: str) -> int:
     """
     Read and validate a 4-digit year input
 
@@ -344,7 +557,7 @@ def read_year_input(prompt: str) -> str:
         prompt: The text prompt to display to the user
 
     Returns:
-        A year string
+        The year as an int
     """
     field = prompt.replace(":", "").strip()
 
@@ -362,7 +575,7 @@ def read_year_input(prompt: str) -> str:
             print(f"Year must only contain digits")
             continue
 
-        return value
+        return int(value)
 
 
 def create_new_book_item(library: Library) -> None:
@@ -385,7 +598,7 @@ def create_new_book_item(library: Library) -> None:
 
     print("\nDetails:")
     print(
-        f"\tTitle: {title}\n\tWriter: {writer}\n\tISBN-13: {isbn}\n\tPublishing year: {publishing_year}"
+        f"\tTitle: {title}\n\tWriter: {writer}\n\tISBN-13: {isbn}\n\tPublishing year: {publishing_year:04d}"
     )
 
     while True:
@@ -422,11 +635,33 @@ def print_menu_commands() -> None:
     print(MENU_BORDER)
 
 
+def exit_program(library: Library) -> None:
+    """
+    Exit the program
+
+    Args:
+        library: The Library object (unused, the menu commands share the same signature)
+
+    Returns:
+        None
+    """
+    logger.debug("Exiting program")
+    sys.exit()
+
+
+# Menu command -> function to execute with the Library object
+MENU_COMMANDS = {
+    "1": create_new_book_item,
+    "2": Library.list_books,
+    "Q": exit_program,
+}
+
+
 def execute_menu_command(library: Library) -> None:
     """
     Process the menu selection and execute the corresponding command
     - Gets user menu selection input
-    - Validates the input against the available options (1, 2, Q)
+    - Validates the input against the available options (MENU_COMMANDS)
     - Executes the appropriate function:
         - "1": Add a new book to the library
         - "2": List all the books in the library database
@@ -441,21 +676,14 @@ def execute_menu_command(library: Library) -> None:
     """
 
     menu_command = input("> ").strip().upper()
-    if menu_command not in ["1", "2", "Q"]:
+    command = MENU_COMMANDS.get(menu_command)
+    if command is None:
         log_msg = f"Unknown command: {menu_command}"
         print(f"{log_msg}, please try again")
         logger.warning(log_msg)
         return
 
-    match menu_command:
-        case "1":
-            create_new_book_item(library)
-        case "2":
-            library.list_books()
-        case "Q":
-            log_msg = "Exiting program"
-            logger.debug(log_msg)
-            sys.exit()
+    command(library)
 
 
 def main():
@@ -474,7 +702,7 @@ def main():
         args = parser.parse_args()
 
         library = Library(args.filename)
-        logger.debug(f"Library loaded with {len(library.books)} existing books")
+        logger.debug("Library loaded with %d existing books", len(library.books))
 
         while True:
             try:
@@ -1,34 +1,50 @@
+import logging
 import os
 import pytest
 
+import library as library_module
 from library import Book, Library
 
 
 class TestBook:
     def test_book_creation(self):
         """Test that a Book object is created correctly"""
-        book = Book("Test Book One", "J", "1234567890123", "2000")
+        book = Book("Test Book One", "J", "1234567890123", 2000)
         assert book.title == "Test Book One"
         assert book.writer == "J"
-        assert book.isbn == "1234567890123"
-        assert book.publishing_year == "2000"
+        assert book.isbn == 1234567890123
+        assert book.publishing_year == 2000
         assert book.sort_index == 2000
 
+    def test_book_isbn_leading_zeros(self):
+        """Test that an ISBN-13 with leading zeros is formatted with all 13 digits"""
+        book = Book("Test Book", "J", "0012345678901", 2000)
+        assert book.isbn == 12345678901
+        assert book.file_line_format() == "Test Book/J/0012345678901/2000"
+
+    def test_book_creation_from_strings(self):
+        """Test that the ISBN-13 and the publishing year can be given as strings"""
+        book = Book("Test Book", "J", "1234567890123", "2000")
+        assert book.isbn == 1234567890123
+        assert book.publishing_year == 2000
+        assert book.sort_index == 2000
+        assert book.file_line_format() == "Test Book/J/1234567890123/2000"
+
     def test_book_string_representation(self):
         """Test that a Book object's string presentation is correcty"""
-        book = Book("Test Book", "Test Author", "1234567890123", "2000")
+        book = Book("Test Book", "Test Author", "1234567890123", 2000)
         assert str(book) == "TEST BOOK (2000) by Test Author [ISBN-13: 1234567890123]"
 
     def test_book_file_line_format(self):
         """Test that a Book object line is formatted correctly"""
-        book = Book("Test Book", "J", "1234567890123", "2000")
+        book = Book("Test Book", "J", "1234567890123", 2000)
         assert book.file_line_format() == "Test Book/J/1234567890123/2000"
 
     def test_book_sorting(self):
         """Test that books are sorted correctly by the publishing year"""
-        book1 = Book("Test Book One", "J", "1234567890123", "2025")
-        book2 = Book("Test Book Two", "J", "1234567890124", "1990")
-        book3 = Book("Test Book Three", "J", "1234567890125", "2010")
+        book1 = Book("Test Book One", "J", "1234567890123", 2025)
+        book2 = Book("Test Book Two", "J", "1234567890124", 1990)
+        book3 = Book("Test Book Three", "J", "1234567890125", 2010)
 
         sorted_books = sorted([book1, book2, book3])
         assert sorted_books[0] == book2  # 1990
@@ -37,6 +53,15 @@ class TestBook:
 
 
 class TestLibrary:
+    @pytest.fixture(autouse=True, params=["sorted", "list"])
+    def book_collection(self, request, monkeypatch):
+        """Runs every test with both the SortedKeyList and the plain list book collection"""
+        if request.param == "sorted":
+            pytest.importorskip("sortedcontainers")
+        else:
+            monkeypatch.setattr(library_module, "SortedKeyList", None)
+        return request.param
+
     @pytest.fixture
     def test_db_path(self, tmp_path):
         """Returns a DB file test path"""
@@ -102,7 +127,7 @@ class TestLibrary:
         library = Library(db_file_empty)
 
         # Add a new book
-        new_book = Book("Test Book", "J", "1234567890123", "2020")
+        new_book = Book("Test Book", "J", "1234567890123", 2020)
         library.save_to_database(new_book)
 
         # Verify book was added
@@ -113,3 +138,179 @@ class TestLibrary:
         with open(db_file_empty, "r") as f:
             content = f.read()
         assert "Test Book/J/1234567890123/2020" in content
+
+    def test_empty_lines_removed_from_database(self, db_file_malformed):
+        """Test that empty lines are removed from the database file while loading"""
+        Library(str(db_file_malformed))
+
+        with open(db_file_malformed, "r") as f:
+            lines = f.readlines()
+        assert len(lines) == 5
+        assert all(line.strip() for line in lines)
+
+    def test_save_many_books_to_database(self, db_file_two_books):
+        """Test saving multiple books at once, skipping the duplicate ISBN-13s"""
+        library = Library(str(db_file_two_books))
+
+        library.save_many(
+            [
+                Book("Test Book Three", "J", "1234567890125", 2010),
+                Book("Test Book Duplicate", "J", "1234567890123", 2011),
+                Book("Test Book Four", "J", "1234567890126", 1990),
+                Book("Test Book Duplicate", "J", "1234567890126", 1991),
+            ]
+        )
+
+        assert len(library.books) == 4
+        book_titles = [book.title for book in library.books]
+        assert "Test Book Three" in book_titles
+        assert "Test Book Four" in book_titles
+        assert "Test Book Duplicate" not in book_titles
+
+        with open(db_file_two_books, "r") as f:
+            lines = f.read().splitlines()
+        assert lines[2:] == [
+            "Test Book Three/J/1234567890125/2010",
+            "Test Book Four/J/1234567890126/1990",
+        ]
+
+    def test_list_books_sorted_after_save(self, db_file_two_books, capsys):
+        """Test that the books are listed sorted by year after adding a new book"""
+        library = Library(str(db_file_two_books))
+        library.list_books()
+
+        library.save_to_database(Book("Test Book Three", "J", "1234567890125", 1990))
+        capsys.readouterr()
+        library.list_books()
+
+        lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("\t")]
+        assert len(lines) == 3
+        assert lines[0].startswith("\tTEST BOOK THREE (1990)")
+
+    def test_extra_fields_ignored(self, test_db_path):
+        """Test that only the first 4 fields of a line with extra fields are used"""
+        with open(test_db_path, "w") as f:
+            f.write("Test Book One / J / 1234567890123 / 2020 / Extra/Extra\n")
+
+        library = Library(str(test_db_path))
+
+        assert len(library.books) == 1
+        assert library.books[0].title == "Test Book One"
+        assert library.books[0].writer == "J"
+        assert library.books[0].sort_index == 2020
+
+    def test_hyphenated_isbn_loaded(self, test_db_path):
+        """Test that hyphenated ISBN-13s in the database are loaded without the hyphens"""
+        with open(test_db_path, "w") as f:
+            f.write("Test Book One/J/123-456-78901-2-3/2020\n")
+            f.write("Test Book Two/J/123-456/2020\n")  # Invalid ISBN-13, too short
+
+        library = Library(str(test_db_path))
+
+        assert len(library.books) == 1
+        assert library.books[0].isbn == 1234567890123
+
+    def test_library_equality_ignores_sorted_view(self, db_file_two_books):
+        """Test that building the sorted view doesn't change the library equality"""
+        library_one = Library(str(db_file_two_books))
+        library_two = Library(str(db_file_two_books))
+
+        library_one.list_books()
+
+        assert library_one == library_two
+
+    def test_book_collection_order(self, db_file_two_books, book_collection):
+        """Test that a SortedKeyList keeps the books sorted by year and a plain list keeps the insertion order"""
+        library = Library(str(db_file_two_books))
+
+        library.save_to_database(Book("Test Book Three", "J", "1234567890125", 1990))
+
+        if book_collection == "sorted":
+            assert [book.sort_index for book in library.books] == [1990, 2025, 2025]
+            assert library.books[0].title == "Test Book Three"
+        else:
+            assert isinstance(library.books, list)
+            assert [book.sort_index for book in library.books] == [2025, 2025, 1990]
+            assert library.books[2].title == "Test Book Three"
+
+    def test_fields_stripped(self, test_db_path):
+        """Test that the whitespace around the fields is removed"""
+        with open(test_db_path, "w") as f:
+            f.write("  Test Book One /  J  / 1234567890123 / 2020  \n")
+
+        library = Library(str(test_db_path))
+
+        assert len(library.books) == 1
+        assert library.books[0].file_line_format() == "Test Book One/J/1234567890123/2020"
+
+    @pytest.mark.parametrize("padding_lines", [0, 50000], ids=["small", "over-1MiB"])
+    def test_cr_line_endings(self, test_db_path, padding_lines):
+        """Test that small and large database files with CR line endings are split the same way"""
+        with open(test_db_path, "wb") as f:
+            f.write(b"A/J/1234567890123/2020\rB/J/1234567890124/2021\r")
+            f.write(b"Padding Book Title/Padding Writer/1234567890125/1990\r" * padding_lines)
+
+        library = Library(str(test_db_path))
+
+        assert len(library.books) == 2 + padding_lines
+        book_titles = [book.title for book in library.books]
+        assert "A" in book_titles
+        assert "B" in book_titles
+
+    @pytest.mark.parametrize("empty_line", [b"", b"\n"], ids=["clean", "empty-line"])
+    def test_invalid_utf8_line(self, test_db_path, empty_line):
+        """Test that the loader exits on a database file with an invalid UTF-8 line"""
+        with open(test_db_path, "wb") as f:
+            f.write(b"Test Book One/J/1234567890123/2020\n" + empty_line)
+            f.write(b"Test Book \xff/J/1234567890124/2030\n")
+
+        with pytest.raises(SystemExit) as exc_info:
+            Library(str(test_db_path))
+        assert exc_info.value.code == 1
+
+    def test_clean_database_not_rewritten(self, db_file_two_books):
+        """Test that a database file without empty lines is not re-written"""
+        os.utime(db_file_two_books, ns=(0, 0))
+        Library(str(db_file_two_books))
+
+        assert os.stat(db_file_two_books).st_mtime_ns == 0
+
+    def test_malformed_lines_warnings(self, db_file_malformed, caplog, capsys):
+        """Test that a warning is logged and shown once on stdout for each malformed line"""
+        with caplog.at_level(logging.WARNING, logger="library.database"):
+            Library(str(db_file_malformed))
+
+        messages = [record.getMessage() for record in caplog.records]
+        assert len(messages) == 3
+        assert "Line 3 has 2 parts, expected 4, ignoring" in messages[0]
+        assert "Line 4 has an invalid ISBN-13: '123456789012A', ignoring" in messages[1]
+        assert "Line 5 has an invalid (non-digit) year: 'Test', ignoring" in messages[2]
+
+        out_lines = capsys.readouterr().out.splitlines()
+        for message in messages:
+            assert out_lines.count(message) == 1
+
+    def test_crlf_line_endings(self, test_db_path):
+        """Test that a database file with CRLF line endings is loaded and cleaned correctly"""
+        with open(test_db_path, "wb") as f:
+            f.write(b"Test Book One/J/1234567890123/2020\r\n\r\nTest Book Two/J/1234567890124/2030\r\n")
+
+        library = Library(str(test_db_path))
+
+        assert [book.title for book in library.books] == ["Test Book One", "Test Book Two"]
+        with open(test_db_path, "rb") as f:
+            assert f.read() == b"Test Book One/J/1234567890123/2020\r\nTest Book Two/J/1234567890124/2030\r\n"
+
+
+class TestInput:
+    def test_read_isbn_input(self, monkeypatch, capsys):
+        """Test that invalid ISBN-13 inputs are rejected until a valid one is given"""
+        inputs = iter(["", "123-456", "123456789012A", "123-456-78901-2-3"])
+        monkeypatch.setattr("builtins.input", lambda prompt: next(inputs))
+
+        assert library_module.read_isbn_input("ISBN-13: ") == "1234567890123"
+
+        out = capsys.readouterr().out
+        assert "'ISBN-13' cannot be empty, please try again" in out
+        assert "ISBN-13 must contain exactly 13 digits" in out
+        assert "ISBN-13 must contain only digits and optional hyphens" in out